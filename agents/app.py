@@ -43,7 +43,7 @@ question = st.text_input("Ask a question")
 if question:
     try:
         index, chunks, chunk_names = build_faiss_index(selected_topic)
-        file_list = list(set(chunk_names))
+        file_list = list({name for names in chunk_names for name in names})
         with st.spinner("Thinking..."):
             result = answer_query_with_context(
                 query=question,
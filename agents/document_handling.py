@@ -1,4 +1,5 @@
 import os
+import re
 import json
 import hashlib
 from pathlib import Path
@@ -60,9 +61,112 @@ def file_hash(file_path: Path):
     with open(file_path, "rb") as f:
         return hashlib.sha256(f.read()).hexdigest()
 
+# ----- Near-duplicate chunk detection -----
+
+# Chunks whose estimated Jaccard similarity (over word shingles) reaches this
+# value are collapsed into one stored chunk. Kept well above the ~0.33 similarity
+# that chunk_by_sentence's sentence overlap gives neighbouring chunks.
+NEAR_DUP_THRESHOLD = 0.85
+MINHASH_NUM_PERM = 128
+LSH_BANDS = 32
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_doc_names(doc_names):
+    """Return chunk attribution as a list of filenames (older metadata stores a single name)."""
+    return [[names] if isinstance(names, str) else list(names) for names in doc_names]
+
+
+def _normalize_chunk(text):
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _shingles(text, size):
+    tokens = re.findall(r"\w+", text.lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class ChunkDeduplicator:
+    """Collapse exact and near-duplicate chunks using SHA256 hashing plus MinHash/LSH."""
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, num_perm=MINHASH_NUM_PERM,
+                 bands=LSH_BANDS, shingle_size=SHINGLE_SIZE, seed=1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._exact = {}
+        self._buckets = {}
+        self._signatures = []
+
+    def signature(self, text):
+        shingles = _shingles(text, self.shingle_size)
+        if not shingles:
+            return None
+        hashes = np.array([
+            int.from_bytes(hashlib.sha256(s.encode("utf-8")).digest()[:4], "little")
+            for s in shingles
+        ], dtype=np.uint64)
+        # a, b and the shingle hashes are all < 2**32, so a * h + b cannot overflow uint64
+        permuted = (np.outer(hashes, self._a) + self._b) % np.uint64(_MERSENNE_PRIME)
+        return (permuted & np.uint64(_MAX_HASH)).min(axis=0)
+
+    def add(self, text):
+        """Register a chunk. Returns (index of its representative chunk, is_duplicate)."""
+        key = hashlib.sha256(_normalize_chunk(text).encode("utf-8")).hexdigest()
+        if key in self._exact:
+            return self._exact[key], True
+
+        sig = self.signature(text)
+        band_keys = []
+        if sig is not None:
+            band_keys = [
+                (band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+            candidates = {idx for bk in band_keys for idx in self._buckets.get(bk, ())}
+            for idx in sorted(candidates):
+                other = self._signatures[idx]
+                if np.mean(sig == other) >= self.threshold:
+                    self._exact[key] = idx
+                    return idx, True
+
+        idx = len(self._signatures)
+        self._signatures.append(sig)
+        self._exact[key] = idx
+        for bk in band_keys:
+            self._buckets.setdefault(bk, []).append(idx)
+        return idx, False
+
+
+def _add_chunk(deduper, chunk, names, chunks, chunk_doc_names):
+    """Append chunk unless it duplicates a stored one, in which case merge its attribution."""
+    idx, is_duplicate = deduper.add(chunk)
+    if is_duplicate:
+        for name in names:
+            if name not in chunk_doc_names[idx]:
+                chunk_doc_names[idx].append(name)
+    else:
+        chunks.append(chunk)
+        chunk_doc_names.append(list(names))
+    return is_duplicate
+
+
 # ----- Main preprocessing and saving function -----
 
-def preprocess_and_save(topic_name, client):
+def preprocess_and_save(topic_name, client, near_dup_threshold=NEAR_DUP_THRESHOLD,
+                        num_perm=MINHASH_NUM_PERM, lsh_bands=LSH_BANDS,
+                        shingle_size=SHINGLE_SIZE):
     topic_path = Path(f'../documents/{topic_name}/metadata')
     topic_path.mkdir(parents=True, exist_ok=True)
 
@@ -75,15 +179,18 @@ def preprocess_and_save(topic_name, client):
             metadata = json.load(f)
         prev_hashes = metadata.get("file_hashes", {})
         old_chunks = metadata.get("chunks", [])
-        old_doc_names = metadata.get("chunk_doc_names", [])
+        old_doc_names = normalize_doc_names(metadata.get("chunk_doc_names", []))
     else:
         prev_hashes = {}
         old_chunks = []
         old_doc_names = []
 
-    all_chunks = []
-    all_chunk_doc_names = []
+    if not (old_chunks and old_doc_names and embeddings_file.exists()):
+        old_chunks = []
+        old_doc_names = []
+
     new_hashes = {}
+    changed_files = []
 
     for filename in list_topic_files(topic_name):
         file_path = Path(f'../documents/{topic_name}') / filename
@@ -93,32 +200,77 @@ def preprocess_and_save(topic_name, client):
         if prev_hashes.get(filename) == current_hash:
             print(f"Skipping unchanged file: {filename}")
             continue
+        changed_files.append(filename)
 
-        print(f"Processing new/updated file: {filename}")
-        text = extract_text(file_path)
-        chunks = chunk_by_sentence(text)
-        all_chunks.extend(chunks)
-        all_chunk_doc_names.extend([filename] * len(chunks))
-
-    if not all_chunks:
+    if not changed_files:
         print("No new or updated chunks to embed.")
-        return
+        return []
+
+    # Drop stale attribution for files being reprocessed, so updated text is
+    # deduplicated only against content from other documents.
+    old_doc_names = [
+        [name for name in names if name not in changed_files]
+        for names in old_doc_names
+    ]
 
-    print(f"Embedding {len(all_chunks)} new chunks...")
-    response = client.embeddings.create(
-        input=all_chunks,
-        model="text-embedding-3-small"
+    deduper = ChunkDeduplicator(
+        threshold=near_dup_threshold,
+        num_perm=num_perm,
+        bands=lsh_bands,
+        shingle_size=shingle_size,
     )
-    new_embeddings = [np.array(item.embedding, dtype="float32") for item in response.data]
-    new_embeddings_np = np.stack(new_embeddings)
-
-    if old_chunks and old_doc_names and embeddings_file.exists():
-        old_embeddings = np.load(embeddings_file)
-        all_chunks = old_chunks + all_chunks
-        all_chunk_doc_names = old_doc_names + all_chunk_doc_names
-        embeddings_np = np.vstack([old_embeddings, new_embeddings_np])
+    all_chunks = []
+    all_chunk_doc_names = []
+    kept_rows = []
+    compacted = 0
+    duplicates = 0
+
+    # Seed with stored chunks so new chunks are checked against the existing index
+    for row, (chunk, names) in enumerate(zip(old_chunks, old_doc_names)):
+        if not names:
+            continue
+        if _add_chunk(deduper, chunk, names, all_chunks, all_chunk_doc_names):
+            compacted += 1
+        else:
+            kept_rows.append(row)
+    num_old = len(all_chunks)
+
+    for filename in changed_files:
+        print(f"Processing new/updated file: {filename}")
+        text = extract_text(Path(f'../documents/{topic_name}') / filename)
+        for chunk in chunk_by_sentence(text):
+            if _add_chunk(deduper, chunk, [filename], all_chunks, all_chunk_doc_names):
+                duplicates += 1
+
+    new_chunks = all_chunks[num_old:]
+
+    if compacted:
+        print(f"Compacted {compacted} duplicate chunks in the existing index.")
+    if duplicates:
+        print(f"Collapsed {duplicates} duplicate chunks.")
+
+    if old_chunks:
+        embeddings_np = np.load(embeddings_file)[kept_rows]
     else:
-        embeddings_np = new_embeddings_np
+        embeddings_np = None
+
+    if new_chunks:
+        print(f"Embedding {len(new_chunks)} new chunks...")
+        response = client.embeddings.create(
+            input=new_chunks,
+            model="text-embedding-3-small"
+        )
+        new_embeddings = [np.array(item.embedding, dtype="float32") for item in response.data]
+        new_embeddings_np = np.stack(new_embeddings)
+        if embeddings_np is None:
+            embeddings_np = new_embeddings_np
+        else:
+            embeddings_np = np.vstack([embeddings_np, new_embeddings_np])
+    else:
+        print("No new chunks to embed.")
+
+    if embeddings_np is None:
+        return []
 
     np.save(embeddings_file, embeddings_np)
 
@@ -131,3 +283,4 @@ def preprocess_and_save(topic_name, client):
         json.dump(metadata, f, ensure_ascii=False)
 
     print("Saved embeddings and metadata.")
+    return new_chunks
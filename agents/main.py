@@ -22,7 +22,7 @@ if __name__ == "__main__":
     index = load_faiss_index(topic)
     chunks, chunk_doc_names = load_chunks_from_cache(topic)  # Load saved chunk texts + doc names
 
-    file_list = list(set(chunk_doc_names))  # For routing decisions
+    file_list = list({name for names in chunk_doc_names for name in names})  # For routing decisions
 
     print("\nStep 3: Ask your question.")
     user_question = input("Ask me anything: ")
@@ -92,7 +92,7 @@ def answer_query_with_context(query, index, chunks, chunk_doc_names, client, fil
     for idx, dist in zip(indices[0], distances[0]):
         if idx != -1 and dist <= distance_threshold:
             retrieved_chunks.append(chunks[idx])
-            retrieved_docs.append(chunk_doc_names[idx])
+            retrieved_docs.extend(chunk_doc_names[idx])
 
     faiss_has_results = len(retrieved_chunks) > 0
 
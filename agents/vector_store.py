@@ -8,6 +8,7 @@ from pypdf import PdfReader
 from dotenv import load_dotenv
 from openai import OpenAI
 import spacy 
+from document_handling import normalize_doc_names
 
 def build_faiss_index(topic_name):
     topic_path = Path(f'../documents/{topic_name}/metadata')
@@ -22,7 +23,7 @@ def build_faiss_index(topic_name):
         metadata = json.load(f)
 
     chunks = metadata.get("chunks", [])
-    chunk_doc_names = metadata.get("chunk_doc_names", [])
+    chunk_doc_names = normalize_doc_names(metadata.get("chunk_doc_names", []))
 
     dimension = embeddings.shape[1]
     index = faiss.IndexFlatL2(dimension)